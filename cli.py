@@ -228,6 +228,8 @@ class AutoTDD:
         try:
             if hasattr(self, 'refinement_loop'):
                 self.refinement_loop.cleanup()
+            if hasattr(self, 'quality_checker'):
+                self.quality_checker.cleanup()
         except Exception as e:
             logger.warning("Cleanup failed", error=str(e))
 
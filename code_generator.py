@@ -1,7 +1,8 @@
 """Code Generator Module - Generates Python code using LLM providers."""
 import json
 import requests
-from typing import Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List
 
 from parser import ProblemSpec
 from logger import logger
@@ -17,6 +18,7 @@ class CodeGenerator:
         self.gemini = GeminiProvider()
         self.ollama_url = f"{Config.OLLAMA_HOST}/api/generate"
         self.ollama_model = Config.OLLAMA_MODEL
+        self.session = requests.Session()  # Keeps the Ollama connection alive between calls
         
         # Determine which provider to use
         self.use_gemini = (Config.CODE_LLM_PROVIDER == "gemini" and self.gemini.is_available())
@@ -98,6 +100,48 @@ class CodeGenerator:
         
         return code, metadata
     
+    def generate_k(self, spec: ProblemSpec, test_code: str = None,
+                   feedback: str = None, k: int = 4) -> List[tuple[str, Dict[str, Any]]]:
+        """Generate up to k candidate implementations concurrently.
+        
+        At temperature 0 every request would return the same code, so
+        only one is made. Failed requests and duplicate code are dropped.
+        
+        Args:
+            spec: Problem specification
+            test_code: Generated test code for context
+            feedback: Failure feedback for refinement (optional)
+            k: Number of candidates to request
+            
+        Returns:
+            List of (generated_code, metadata) tuples
+            
+        Raises:
+            RuntimeError: If every request failed
+        """
+        k = 1 if self.temperature == 0 else max(k, 1)
+        
+        with ThreadPoolExecutor(max_workers=k, thread_name_prefix='generate') as pool:
+            futures = [pool.submit(self.generate, spec, test_code, feedback)
+                       for _ in range(k)]
+        
+        candidates = {}
+        last_error = None
+        for future in futures:
+            try:
+                code, metadata = future.result()
+            except Exception as e:
+                last_error = e
+                continue
+            candidates.setdefault(code, metadata)
+        
+        if not candidates:
+            raise RuntimeError(f"All {k} candidate generations failed: {last_error}")
+        
+        logger.info("Generated candidates", requested=k, unique=len(candidates))
+        
+        return list(candidates.items())
+    
     def _build_prompt(self, spec: ProblemSpec, test_code: str = None,
                      feedback: str = None) -> str:
         """Build prompt for code generation."""
@@ -221,7 +265,7 @@ Generate ONLY the Python function '{spec.function_name}':"""
             
             logger.debug("Calling Ollama API", model=self.model)
             
-            response = requests.post(
+            response = self.session.post(
                 self.ollama_url,
                 json=payload,
                 timeout=120  # Increased to 2 minutes
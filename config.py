@@ -15,6 +15,10 @@ class Config:
     
     # Test Generation (CodeLlama via Ollama OR OpenAI)
     TEST_LLM_PROVIDER = os.getenv("TEST_LLM_PROVIDER", "ollama")  # ollama, openai, or gemini
+    TEST_LLM_FALLBACKS = os.getenv("TEST_LLM_FALLBACKS", "")  # Comma-separated providers tried in order when the primary fails
+    LLM_CIRCUIT_FAILURES = int(os.getenv("LLM_CIRCUIT_FAILURES", "3"))  # Consecutive failures before a provider is skipped
+    LLM_CIRCUIT_COOLDOWN = float(os.getenv("LLM_CIRCUIT_COOLDOWN", "30"))  # Seconds a failing provider is skipped for
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))  # Test generation requests in flight in generate_many
     OLLAMA_HOST = os.getenv("OLLAMA_HOST", "http://localhost:11434")
     OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "codellama:7b")
     OLLAMA_TEMPERATURE = float(os.getenv("OLLAMA_TEMPERATURE", "0.2"))
@@ -35,6 +39,7 @@ class Config:
     GEMINI_TEMPERATURE = float(os.getenv("GEMINI_TEMPERATURE", "0.0"))
     GEMINI_MAX_TOKENS = int(os.getenv("GEMINI_MAX_TOKENS", "16384"))  # High limit for thoughts + output (2.5 uses ~8K for thoughts)
     GEMINI_TIMEOUT = int(os.getenv("GEMINI_TIMEOUT", "60"))
+    LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"  # Reuse generated tests for an identical prompt (CACHE_DIR/llm)
     
     # Sandbox Settings
     DOCKER_IMAGE = os.getenv("DOCKER_IMAGE", "auto-tdd-pytest:latest")
@@ -42,11 +47,15 @@ class Config:
     CPU_QUOTA = int(os.getenv("CPU_QUOTA", "50000"))
     NETWORK_DISABLED = os.getenv("NETWORK_DISABLED", "true").lower() == "true"
     EXECUTION_TIMEOUT = int(os.getenv("EXECUTION_TIMEOUT", "30"))
+    SANDBOX_REUSE_CONTAINER = os.getenv("SANDBOX_REUSE_CONTAINER", "false").lower() == "true"  # One long-running container, tests run via exec
+    DEBUG_SYNTAX_CHECK = os.getenv("DEBUG_SYNTAX_CHECK", "false").lower() == "true"  # Compile code on the host before each sandbox run
+    FAIL_FAST = os.getenv("FAIL_FAST", "false").lower() == "true"  # pytest -x: stop at the first failure (pass rates become partial)
     
     # Refinement Loop Settings
     MAX_ITERATIONS = int(os.getenv("MAX_ITERATIONS", "5"))
     MIN_IMPROVEMENT_THRESHOLD = float(os.getenv("MIN_IMPROVEMENT_THRESHOLD", "0.1"))
     CONVERGENCE_PATIENCE = int(os.getenv("CONVERGENCE_PATIENCE", "2"))
+    REFINEMENT_CANDIDATES = int(os.getenv("REFINEMENT_CANDIDATES", "1"))  # Refinements generated and tested per iteration
     
     # RL Reward Settings
     REWARD_TEST_PASS = float(os.getenv("REWARD_TEST_PASS", "10.0"))
@@ -55,6 +64,7 @@ class Config:
     PENALTY_SYNTAX_ERROR = float(os.getenv("PENALTY_SYNTAX_ERROR", "-5.0"))
     PENALTY_RUNTIME_ERROR = float(os.getenv("PENALTY_RUNTIME_ERROR", "-3.0"))
     PENALTY_TIMEOUT = float(os.getenv("PENALTY_TIMEOUT", "-8.0"))
+    REWARD_HISTORY_MAXLEN = int(os.getenv("REWARD_HISTORY_MAXLEN", "256"))  # Most recent rewards kept per calculator
     
     # Paths
     BASE_DIR = Path(__file__).parent
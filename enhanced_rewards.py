@@ -1,12 +1,14 @@
 """Enhanced Reward System with Multi-Dimensional Scoring."""
 import ast
 import re
+from collections import deque
 from typing import Dict, Any, List, Tuple, Optional
 import Levenshtein
 from radon.complexity import cc_visit
 from radon.metrics import mi_visit
 
 from logger import logger
+from config import Config
 
 
 class PartialCorrectnessCalculator:
@@ -458,7 +460,8 @@ class EnhancedRewardCalculator:
     """Composite reward calculator with multiple dimensions."""
     
     def __init__(self):
-        self.history = []
+        # Bounded so long-running sessions don't accumulate every breakdown
+        self.history = deque(maxlen=Config.REWARD_HISTORY_MAXLEN or 256)
         self.partial_calc = PartialCorrectnessCalculator()
         self.quality_calc = CodeQualityCalculator()
         self.efficiency_calc = EfficiencyCalculator()
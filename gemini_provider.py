@@ -17,6 +17,7 @@ class GeminiProvider:
         # Gemini API endpoint - don't add models/ prefix if already present
         model_path = self.model if self.model.startswith("models/") else f"models/{self.model}"
         self.api_url = f"https://generativelanguage.googleapis.com/v1beta/{model_path}:generateContent"
+        self.session = requests.Session()  # Reuses the TLS connection between calls
         
         if not self.api_key:
             logger.warning("GEMINI_API_KEY not set, will use fallback")
@@ -58,7 +59,7 @@ class GeminiProvider:
             # Add API key to URL
             url = f"{self.api_url}?key={self.api_key}"
             
-            response = requests.post(
+            response = self.session.post(
                 url,
                 json=payload,
                 headers=headers,
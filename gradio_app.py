@@ -114,6 +114,7 @@ def run_auto_tdd(problem_description):
     state.chain_of_thought = []
     state.iterations = []
     state.progress = 0
+    sandbox = quality = refiner = None
     
     try:
         # Initialize components
@@ -359,6 +360,16 @@ def run_auto_tdd(problem_description):
             thoughts=state.add_thought("Process terminated due to error."
         )
         )
+    
+    finally:
+        # Each run builds its own components; release their containers and
+        # temp directories instead of leaving them to the next run
+        for component in (refiner, sandbox, quality):
+            if component is not None:
+                try:
+                    component.cleanup()
+                except Exception as e:
+                    state.add_log(f"Cleanup failed: {e}", "WARNING")
 
 def format_iteration_table(iterations):
     """Format iteration history with detailed reward breakdown"""
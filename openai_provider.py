@@ -16,6 +16,7 @@ class OpenAIProvider:
         
         # OpenAI API endpoint
         self.api_url = "https://api.openai.com/v1/chat/completions"
+        self.session = requests.Session()  # Reuses the TLS connection between calls
         
         # Safety limits for free tier
         self.max_tokens_per_request = 1000  # Keep tokens low to avoid charges
@@ -78,7 +79,7 @@ class OpenAIProvider:
                 "Authorization": f"Bearer {self.api_key}"
             }
             
-            response = requests.post(
+            response = self.session.post(
                 self.api_url,
                 json=payload,
                 headers=headers,
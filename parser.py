@@ -1,44 +1,51 @@
 """Prompt Parser Module - Converts natural language to structured specifications."""
 import re
 import json
-from typing import Dict, List, Optional, Any
+from functools import lru_cache
+from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, asdict
 
 from logger import logger
 from utils import sanitize_function_name
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ParameterSpec:
     """Specification for a function parameter."""
     name: str
     type_hint: str
     description: str = ""
-    constraints: List[str] = None
-    
-    def __post_init__(self):
-        if self.constraints is None:
-            self.constraints = []
+    constraints: Tuple[str, ...] = ()
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ProblemSpec:
-    """Structured specification of a coding problem."""
+    """Structured specification of a coding problem.
+    
+    PromptParser.parse returns cached instances, so the same spec can reach
+    several callers. The fields are tuples, but the example dicts inside
+    them are plain dicts: treat them as read-only.
+    """
     problem_name: str
     function_name: str
-    parameters: List[ParameterSpec]
+    parameters: Tuple[ParameterSpec, ...]
     return_type: str
     description: str
-    constraints: List[str]
-    examples: List[Dict[str, Any]]
-    edge_cases: List[str]
+    constraints: Tuple[str, ...]
+    examples: Tuple[Dict[str, Any], ...]
+    edge_cases: Tuple[str, ...]
     
     def to_dict(self) -> Dict:
-        """Convert to dictionary."""
-        return asdict(self)
+        """Convert to dictionary (tuples are converted back to lists)."""
+        return asdict(self, dict_factory=_listify_dict_factory)
     
     def to_json(self) -> str:
         """Convert to JSON string."""
         return json.dumps(self.to_dict(), indent=2)
 
+def _listify_dict_factory(items: List[Tuple[str, Any]]) -> Dict:
+    """dict_factory for asdict() that turns tuple fields into lists."""
+    return {key: list(value) if isinstance(value, tuple) else value
+            for key, value in items}
+
 class PromptParser:
     """Parses natural language problem descriptions into structured specifications."""
     
@@ -72,7 +79,10 @@ class PromptParser:
             ProblemSpec object with extracted information
         """
         logger.info("Parsing prompt", prompt_length=len(prompt))
-        
+        return _parse_cached(prompt)
+    
+    def _parse_uncached(self, prompt: str) -> ProblemSpec:
+        """Run the full extraction pipeline on a prompt."""
         # Extract problem name
         problem_name = self._extract_problem_name(prompt)
         function_name = sanitize_function_name(problem_name)
@@ -98,12 +108,12 @@ class PromptParser:
         spec = ProblemSpec(
             problem_name=problem_name,
             function_name=function_name,
-            parameters=parameters,
+            parameters=tuple(parameters),
             return_type=return_type,
             description=description,
-            constraints=constraints,
-            examples=examples,
-            edge_cases=edge_cases
+            constraints=tuple(constraints),
+            examples=tuple(examples),
+            edge_cases=tuple(edge_cases)
         )
         
         logger.info("Parsed specification", 
@@ -356,3 +366,12 @@ class PromptParser:
         
         # Return as string
         return value_str
+
+@lru_cache(maxsize=256)
+def _parse_cached(prompt: str) -> ProblemSpec:
+    """Memoized parse keyed on the prompt alone, shared by all parsers.
+    
+    Each run builds its own PromptParser, so a per-instance cache would
+    never hit across runs and would keep every parser alive.
+    """
+    return PromptParser()._parse_uncached(prompt)
@@ -1,17 +1,26 @@
 """Refinement Loop Module with RL-based rewards."""
 import time
-from typing import Tuple, Optional, List
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Iterator, Tuple, Optional, List
 from dataclasses import dataclass
 
 from parser import ProblemSpec
 from sandbox_runner import SandboxRunner, TestResult
 from failure_analyzer import FailureAnalyzer, FailureAnalysis
 from code_generator import CodeGenerator
+from quality_checks import QualityChecker
 from logger import logger
 from config import Config
 from metrics import MetricsCollector
+from utils import calculate_code_digest, validate_python_syntax
 from enhanced_rewards import EnhancedRewardCalculator
 
+# Sandbox runs for refinement candidates (threads start on first submit);
+# unused with SANDBOX_REUSE_CONTAINER, where candidates run one at a time
+_POOL = ThreadPoolExecutor(max_workers=max(Config.REFINEMENT_CANDIDATES, 1),
+                           thread_name_prefix='refine')
+
 @dataclass
 class RewardState:
     """State information for RL reward calculation."""
@@ -26,7 +35,8 @@ class RewardCalculator:
     """Calculates RL-style rewards for code generation iterations."""
     
     def __init__(self):
-        self.history = []
+        # Bounded so long-running sessions don't accumulate every reward
+        self.history = deque(maxlen=Config.REWARD_HISTORY_MAXLEN or 256)
     
     def calculate_reward(self, state: RewardState) -> float:
         """Calculate reward for current state using RL principles.
@@ -43,58 +53,66 @@ class RewardCalculator:
         Returns:
             Total reward value
         """
+        # Bind config constants once - this runs every iteration
+        reward_test_pass = Config.REWARD_TEST_PASS
+        reward_quality_bonus = Config.REWARD_QUALITY_BONUS
+        reward_efficiency_bonus = Config.REWARD_EFFICIENCY_BONUS
+        test_result = state.test_result
+        quality = state.code_quality or {}
+        
         reward = 0.0
         
         # 1. Base reward from test results
-        pass_rate = state.test_result.passed / max(state.test_result.total, 1)
-        reward += pass_rate * Config.REWARD_TEST_PASS
+        pass_rate = test_result.passed / max(test_result.total, 1)
+        base_reward = pass_rate * reward_test_pass
+        reward += base_reward
         
         # 2. Improvement reward (compared to previous iteration)
         if state.prev_pass_rate is not None:
             improvement = pass_rate - state.prev_pass_rate
             if improvement > 0:
-                reward += improvement * Config.REWARD_EFFICIENCY_BONUS * 2
+                reward += improvement * reward_efficiency_bonus * 2
             elif improvement < 0:
                 # Regression penalty
                 reward += improvement * 10  # Negative reward
         
         # 3. Quality bonuses
-        if state.code_quality:
+        if quality:
             # Low complexity bonus
-            complexity = state.code_quality.get('complexity', 10)
+            complexity = quality.get('complexity', 10)
             if complexity < 5:
-                reward += Config.REWARD_QUALITY_BONUS * 0.5
+                reward += reward_quality_bonus * 0.5
             elif complexity < 10:
-                reward += Config.REWARD_QUALITY_BONUS * 0.25
+                reward += reward_quality_bonus * 0.25
             
             # No lint errors bonus
-            if state.code_quality.get('lint_errors', 0) == 0:
-                reward += Config.REWARD_QUALITY_BONUS * 0.3
+            if quality.get('lint_errors', 0) == 0:
+                reward += reward_quality_bonus * 0.3
             
             # No security issues bonus
-            if state.code_quality.get('security_issues', 0) == 0:
-                reward += Config.REWARD_QUALITY_BONUS * 0.2
+            if quality.get('security_issues', 0) == 0:
+                reward += reward_quality_bonus * 0.2
         
         # 4. Efficiency bonus (fast execution)
         if state.execution_time < 1.0:
-            reward += Config.REWARD_EFFICIENCY_BONUS
+            reward += reward_efficiency_bonus
         elif state.execution_time < 3.0:
-            reward += Config.REWARD_EFFICIENCY_BONUS * 0.5
+            reward += reward_efficiency_bonus * 0.5
         
         # 5. Penalties
-        if state.test_result.timed_out:
+        if test_result.timed_out:
             reward += Config.PENALTY_TIMEOUT
         
-        if state.test_result.errors > 0:
-            reward += Config.PENALTY_RUNTIME_ERROR * state.test_result.errors
+        if test_result.errors > 0:
+            reward += Config.PENALTY_RUNTIME_ERROR * test_result.errors
         
         # Syntax penalty (from quality)
-        if state.code_quality.get('syntax_error', False):
+        if quality.get('syntax_error', False):
             reward += Config.PENALTY_SYNTAX_ERROR
         
         # 6. Convergence bonus (all tests pass)
         if pass_rate == 1.0:
-            reward += Config.REWARD_TEST_PASS * 2  # Double reward for perfect score
+            reward += reward_test_pass * 2  # Double reward for perfect score
         
         # Store for analysis
         self.history.append({
@@ -102,8 +120,8 @@ class RewardCalculator:
             'reward': reward,
             'pass_rate': pass_rate,
             'components': {
-                'base': pass_rate * Config.REWARD_TEST_PASS,
-                'quality': reward - (pass_rate * Config.REWARD_TEST_PASS)
+                'base': base_reward,
+                'quality': reward - base_reward
             }
         })
         
@@ -121,10 +139,12 @@ class RefinementLoop:
         self.sandbox = SandboxRunner()
         self.analyzer = FailureAnalyzer()
         self.generator = CodeGenerator()
+        self.quality_checker = QualityChecker()
         self.reward_calculator = RewardCalculator()
         self.enhanced_reward_calculator = EnhancedRewardCalculator()  # NEW: Multi-dimensional rewards
         self.max_iterations = Config.MAX_ITERATIONS
         self.convergence_patience = Config.CONVERGENCE_PATIENCE
+        self.num_candidates = max(Config.REFINEMENT_CANDIDATES, 1)
     
     def refine(self, spec: ProblemSpec, initial_code: str, 
                test_code: str) -> Tuple[str, dict]:
@@ -149,6 +169,16 @@ class RefinementLoop:
         best_iteration = 0
         best_code_pass_rate = 0.0  # Track pass rate of best code
         
+        # Results for the last evaluated code, reused when a rejected
+        # refinement leaves the code unchanged
+        last_code_hash = None
+        last_test = None  # (test_result, execution_time)
+        last_quality = None
+        
+        # Last (code hash, feedback) -> refined code; only reused when the
+        # generator is deterministic (temperature 0)
+        last_generation = (None, None)
+        
         metadata = {
             'iterations': [],
             'converged': False,
@@ -160,17 +190,26 @@ class RefinementLoop:
         for iteration in range(1, self.max_iterations + 1):
             logger.info(f"Refinement iteration {iteration}/{self.max_iterations}")
             
-            start_time = time.time()
-            
-            # Run tests in sandbox
-            test_result = self.sandbox.run_tests(code, test_code)
-            
-            execution_time = time.time() - start_time
-            
-            # Analyze code quality
-            from quality_checks import QualityChecker
-            quality_checker = QualityChecker()
-            quality_result = quality_checker.check(code)
+            code_hash = calculate_code_digest(code)
+            if code_hash == last_code_hash:
+                # Same code as last iteration - tests and quality can't change
+                logger.info("Code unchanged, reusing previous test and quality results")
+                test_result, execution_time = last_test
+                quality_result = last_quality
+            else:
+                start_time = time.time()
+                
+                # Run tests in sandbox
+                test_result = self.sandbox.run_tests(code, test_code)
+                
+                execution_time = time.time() - start_time
+                
+                # Analyze code quality
+                quality_result = self.quality_checker.check(code)
+                
+                last_code_hash = code_hash
+                last_test = (test_result, execution_time)
+                last_quality = quality_result
             
             # Calculate reward (OLD: basic single-dimension)
             reward_state = RewardState(
@@ -285,21 +324,49 @@ class RefinementLoop:
             
             # Generate refined code
             try:
-                refined_code, gen_metadata = self.generator.generate(
-                    spec,
-                    test_code,
-                    feedback
-                )
-                
-                # Validate refinement
-                from utils import validate_python_syntax
-                is_valid, error = validate_python_syntax(refined_code)
-                
-                if not is_valid:
-                    logger.error("Refined code has syntax errors",
-                               error=error)
-                    # Keep previous code
-                    refined_code = code
+                generation_key = (code_hash, feedback)
+                if generation_key == last_generation[0] and self.generator.temperature == 0:
+                    # Deterministic generator, identical prompt - same answer
+                    logger.info("Feedback unchanged, reusing previous refinement")
+                    refined_code = last_generation[1]
+                elif self.num_candidates > 1:
+                    candidates = [
+                        candidate for candidate, _ in self.generator.generate_k(
+                            spec, test_code, feedback, k=self.num_candidates
+                        )
+                        if validate_python_syntax(candidate)[0]
+                    ]
+                    
+                    if candidates:
+                        # Candidates are tested here, so the next iteration
+                        # reuses the winner's results instead of re-running them
+                        refined_code, last_test, last_quality = self._evaluate_candidates(
+                            candidates, test_code
+                        )
+                        last_code_hash = calculate_code_digest(refined_code)
+                    else:
+                        logger.error("All refinement candidates have syntax errors")
+                        # Keep previous code
+                        refined_code = code
+                    
+                    last_generation = (generation_key, refined_code)
+                else:
+                    refined_code, gen_metadata = self.generator.generate(
+                        spec,
+                        test_code,
+                        feedback
+                    )
+                    
+                    # Validate refinement
+                    is_valid, error = validate_python_syntax(refined_code)
+                    
+                    if not is_valid:
+                        logger.error("Refined code has syntax errors",
+                                   error=error)
+                        # Keep previous code
+                        refined_code = code
+                    
+                    last_generation = (generation_key, refined_code)
                 
                 code = refined_code
                 prev_pass_rate = pass_rate
@@ -320,7 +387,99 @@ class RefinementLoop:
         
         return best_code, metadata
     
+    def _run_tests_timed(self, code: str, test_code: str) -> Tuple[TestResult, float]:
+        """Run tests in the sandbox, returning the result and wall time."""
+        start_time = time.time()
+        test_result = self.sandbox.run_tests(code, test_code)
+        return test_result, time.time() - start_time
+    
+    def _start_candidate_runs(self, candidates: List[str],
+                              test_code: str) -> Iterator[Tuple[int, Optional[Tuple[TestResult, float]], Optional[Exception]]]:
+        """Start sandbox runs for candidates and iterate over their outcomes.
+        
+        Per-run containers each have their own memory limit, so every run
+        is submitted right away and outcomes arrive as runs complete. A
+        reused container is sized for a single run, so candidates are then
+        tested one at a time, in order, as the iterator is advanced. Runs
+        not yet started are cancelled when iteration stops.
+        
+        Returns:
+            Iterator of (candidate index, (test_result, execution_time),
+            exception); exactly one of the last two is None
+        """
+        if Config.SANDBOX_REUSE_CONTAINER:
+            def run_in_turn():
+                for index, candidate in enumerate(candidates):
+                    try:
+                        yield index, self._run_tests_timed(candidate, test_code), None
+                    except Exception as e:
+                        yield index, None, e
+            return run_in_turn()
+        
+        futures = {
+            _POOL.submit(self._run_tests_timed, candidate, test_code): index
+            for index, candidate in enumerate(candidates)
+        }
+        
+        def drain():
+            try:
+                for future in as_completed(futures):
+                    try:
+                        yield futures[future], future.result(), None
+                    except Exception as e:
+                        yield futures[future], None, e
+            finally:
+                for pending in futures:
+                    pending.cancel()
+        return drain()
+    
+    def _evaluate_candidates(self, candidates: List[str], 
+                             test_code: str) -> Tuple[str, Tuple[TestResult, float], dict]:
+        """Test several candidate implementations and pick one.
+        
+        Sandbox runs are started first (see _start_candidate_runs) and
+        quality checks run while they execute. The first candidate passing
+        every test wins and runs not yet started are cancelled; otherwise
+        the candidate with the highest pass rate wins.
+        
+        Args:
+            candidates: Syntax-valid candidate implementations
+            test_code: Test suite code
+            
+        Returns:
+            Tuple of (code, (test_result, execution_time), quality_result)
+        """
+        logger.info("Evaluating refinement candidates", count=len(candidates))
+        
+        runs = self._start_candidate_runs(candidates, test_code)
+        qualities = self.quality_checker.check_batch(candidates)
+        
+        tests = {}
+        for index, outcome, error in runs:
+            if error is not None:
+                logger.warning("Candidate test run failed", candidate=index, error=str(error))
+                continue
+            
+            tests[index] = outcome
+            test_result = outcome[0]
+            if test_result.failed == 0 and test_result.errors == 0 and test_result.passed > 0:
+                break
+        runs.close()
+        
+        if not tests:
+            raise RuntimeError("All candidate test runs failed")
+        
+        # Earliest candidate wins ties, like the single-candidate path
+        best = max(sorted(tests), key=lambda i: tests[i][0].passed / max(tests[i][0].total, 1))
+        
+        logger.info("Selected refinement candidate", candidate=best,
+                   passed=tests[best][0].passed, evaluated=len(tests))
+        
+        return candidates[best], tests[best], qualities[best]
+    
     def cleanup(self):
         """Clean up resources."""
         if self.sandbox:
             self.sandbox.cleanup()
+        if self.quality_checker:
+            self.quality_checker.cleanup()
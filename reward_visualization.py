@@ -1,7 +1,35 @@
 """Visualization utilities for Gradio UI."""
 import json
-from typing import Dict, List, Any
+from typing import Dict, Iterator, List, Any
 
+try:
+    import orjson  # Installed with gradio; C-accelerated encoder
+except ImportError:
+    orjson = None
+
+# Max possible reward per dimension (others default to 10)
+_MAX_REWARDS = {
+    'test_passing': 50,
+    'partial_correctness': 15,
+    'code_quality': 10,
+    'efficiency': 10,
+    'improvement': 10,
+    'convergence': 5
+}
+
+# Every progress bar, indexed by filled length (20 chars = 100%)
+_BARS = tuple('█' * i + '░' * (20 - i) for i in range(21))
+
+# Comparison table rows for iterations with / without a reward breakdown
+_ROW_FMT = "| {it} | {pr:.1%} | {t:.1f} | {p:.1f} | {q:.1f} | {e:.1f} | **{tot:.1f}** |"
+_ROW_BASIC_FMT = "| {it} | {pr:.1%} | - | - | - | - | {br:.1f} |"
+
+# Extra detail shown after a dimension's bar: (key in dimension data, format)
+_DIMENSION_DETAILS = {
+    'partial_correctness': ('average_similarity', " (avg similarity: {:.2f})"),
+    'code_quality': ('complexity_score', " (complexity: {:.2f})"),
+    'efficiency': ('execution_time', " ({:.2f}s)"),
+}
 
 def format_reward_breakdown(metadata: Dict[str, Any]) -> str:
     """Format reward breakdown for display in Gradio.
@@ -12,47 +40,68 @@ def format_reward_breakdown(metadata: Dict[str, Any]) -> str:
     Returns:
         Formatted markdown string with reward visualizations
     """
+    # The generator yields one block per iteration, so join() only sees a
+    # short list; writing the blocks through io.StringIO measured slower
+    return '\n'.join(iter_reward_breakdown(metadata))
+
+
+def iter_reward_breakdown(metadata: Dict[str, Any]) -> Iterator[str]:
+    """Yield the reward breakdown markdown piece by piece.
+    
+    Joining the pieces with newlines gives format_reward_breakdown's
+    output; streaming callers can consume them without building it.
+    
+    Args:
+        metadata: Refinement metadata containing iterations with reward breakdowns
+        
+    Yields:
+        Markdown fragments, one per summary line or iteration block
+    """
     if 'iterations' not in metadata or len(metadata['iterations']) == 0:
-        return "No reward data available."
+        yield "No reward data available."
+        return
     
-    output = []
-    output.append("# 🎯 Reward Evolution\n")
+    yield "# 🎯 Reward Evolution\n"
     
     # Overall summary
     final_iter = metadata['iterations'][-1]
     best_iter = metadata.get('best_iteration', len(metadata['iterations']))
     
-    output.append("## Summary\n")
-    output.append(f"- **Best Iteration**: {best_iter}")
-    output.append(f"- **Total Iterations**: {len(metadata['iterations'])}")
-    output.append(f"- **Converged**: {'✅ Yes' if metadata.get('converged', False) else '❌ No'}")
-    output.append(f"- **Final Reward**: {metadata.get('final_reward', 0):.2f}\n")
+    yield "## Summary\n"
+    yield f"- **Best Iteration**: {best_iter}"
+    yield f"- **Total Iterations**: {len(metadata['iterations'])}"
+    yield f"- **Converged**: {'✅ Yes' if metadata.get('converged', False) else '❌ No'}"
+    yield f"- **Final Reward**: {metadata.get('final_reward', 0):.2f}\n"
     
     # Iteration-by-iteration breakdown
-    output.append("## Iteration Details\n")
+    yield "## Iteration Details\n"
     
     for iter_data in metadata['iterations']:
         iteration = iter_data['iteration']
         is_best = (iteration == best_iter)
         
+        # Each iteration is built and yielded as one block rather than
+        # several pieces per dimension
+        parts = []
+        
         # Header
         marker = "⭐ BEST" if is_best else ""
-        output.append(f"### Iteration {iteration} {marker}\n")
+        parts.append(f"### Iteration {iteration} {marker}\n")
         
         # Test results
         passed = iter_data['passed']
         total = iter_data['total']
         pass_rate = iter_data['pass_rate']
         
-        output.append(f"**Tests**: {passed}/{total} passed ({pass_rate:.1%})\n")
+        parts.append(f"**Tests**: {passed}/{total} passed ({pass_rate:.1%})\n")
         
         # Reward breakdown (if available)
         if 'reward_breakdown' in iter_data:
             breakdown = iter_data['reward_breakdown']
             total_reward = breakdown.get('total_reward', 0)
             
-            output.append(f"**Total Reward**: {total_reward:.2f}/100.0\n")
-            output.append("**Breakdown by Dimension**:\n")
+            parts.append(f"**Total Reward**: {total_reward:.2f}/100.0\n")
+            parts.append("**Breakdown by Dimension**:\n")
             
             dimensions = breakdown.get('dimensions', {})
             
@@ -61,54 +110,42 @@ def format_reward_breakdown(metadata: Dict[str, Any]) -> str:
                 reward = dim_data.get('reward', 0)
                 
                 # Get max possible reward based on dimension
-                max_rewards = {
-                    'test_passing': 50,
-                    'partial_correctness': 15,
-                    'code_quality': 10,
-                    'efficiency': 10,
-                    'improvement': 10,
-                    'convergence': 5
-                }
-                max_reward = max_rewards.get(dim_name, 10)
+                max_reward = _MAX_REWARDS.get(dim_name, 10)
                 
                 # Create progress bar
                 percentage = (reward / max_reward) * 100 if max_reward > 0 else 0
-                bar_length = int(percentage / 5)  # 20 chars = 100%
-                bar = '█' * bar_length + '░' * (20 - bar_length)
+                bar = _BARS[max(0, min(20, int(percentage / 5)))]  # 20 chars = 100%
                 
                 # Format dimension name
                 display_name = dim_name.replace('_', ' ').title()
                 
-                output.append(f"- **{display_name}**: {bar} {reward:.1f}/{max_reward}")
-                
                 # Add details for specific dimensions
                 if dim_name == 'test_passing':
-                    output.append(f" ({passed}/{total} tests)")
-                elif dim_name == 'partial_correctness' and 'average_similarity' in dim_data:
-                    avg_sim = dim_data['average_similarity']
-                    output.append(f" (avg similarity: {avg_sim:.2f})")
-                elif dim_name == 'code_quality' and 'complexity_score' in dim_data:
-                    complexity = dim_data['complexity_score']
-                    output.append(f" (complexity: {complexity:.2f})")
-                elif dim_name == 'efficiency' and 'execution_time' in dim_data:
-                    time = dim_data['execution_time']
-                    output.append(f" ({time:.2f}s)")
+                    detail = f" ({passed}/{total} tests)"
+                else:
+                    detail_key, detail_fmt = _DIMENSION_DETAILS.get(dim_name, (None, None))
+                    detail = detail_fmt.format(dim_data[detail_key]) if detail_key in dim_data else ""
                 
-                output.append("\n")
+                parts.append(f"- **{display_name}**: {bar} {reward:.1f}/{max_reward}{detail}\n")
             
             # Show penalties if any
             penalties = breakdown.get('penalties', 0)
             if penalties != 0:
-                output.append(f"**Penalties**: {penalties:.2f}\n")
+                parts.append(f"**Penalties**: {penalties:.2f}\n")
         else:
             # Fallback for old format
             basic_reward = iter_data.get('basic_reward', iter_data.get('reward', 0))
-            output.append(f"**Reward**: {basic_reward:.2f} (basic scoring)\n")
+            parts.append(f"**Reward**: {basic_reward:.2f} (basic scoring)\n")
         
-        output.append(f"**Duration**: {iter_data['duration']:.2f}s\n")
-        output.append("---\n")
-    
-    return '\n'.join(output)
+        parts.append(f"**Duration**: {iter_data['duration']:.2f}s\n")
+        parts.append("---\n")
+        yield '\n'.join(parts)
+
+
+def _dimension_reward(dimensions: Dict[str, Any], name: str) -> float:
+    """Return a dimension's reward, or 0 if the dimension is missing."""
+    dim_data = dimensions.get(name)
+    return dim_data.get('reward', 0) if dim_data else 0
 
 
 def format_reward_comparison(metadata: Dict[str, Any]) -> str:
@@ -136,25 +173,24 @@ def format_reward_comparison(metadata: Dict[str, Any]) -> str:
         
         if 'reward_breakdown' in iter_data:
             breakdown = iter_data['reward_breakdown']
-            dimensions = breakdown.get('dimensions', {})
-            
-            test_r = dimensions.get('test_passing', {}).get('reward', 0)
-            partial_r = dimensions.get('partial_correctness', {}).get('reward', 0)
-            quality_r = dimensions.get('code_quality', {}).get('reward', 0)
-            efficiency_r = dimensions.get('efficiency', {}).get('reward', 0)
-            total_r = breakdown.get('total_reward', 0)
+            dimensions = breakdown.get('dimensions') or {}
             
-            output.append(
-                f"| {iteration} | {pass_rate:.1%} | "
-                f"{test_r:.1f} | {partial_r:.1f} | {quality_r:.1f} | "
-                f"{efficiency_r:.1f} | **{total_r:.1f}** |"
-            )
+            output.append(_ROW_FMT.format_map({
+                'it': iteration,
+                'pr': pass_rate,
+                't': _dimension_reward(dimensions, 'test_passing'),
+                'p': _dimension_reward(dimensions, 'partial_correctness'),
+                'q': _dimension_reward(dimensions, 'code_quality'),
+                'e': _dimension_reward(dimensions, 'efficiency'),
+                'tot': breakdown.get('total_reward', 0)
+            }))
         else:
             basic_reward = iter_data.get('basic_reward', iter_data.get('reward', 0))
-            output.append(
-                f"| {iteration} | {pass_rate:.1%} | "
-                f"- | - | - | - | {basic_reward:.1f} |"
-            )
+            output.append(_ROW_BASIC_FMT.format_map({
+                'it': iteration,
+                'pr': pass_rate,
+                'br': basic_reward
+            }))
     
     return '\n'.join(output)
 
@@ -187,10 +223,12 @@ def format_reward_json(metadata: Dict[str, Any]) -> str:
             breakdown = iter_data['reward_breakdown']
             iter_summary['total_reward'] = breakdown.get('total_reward', 0)
             
-            # Simplified dimension rewards
+            # Simplified dimension rewards (already rounded to 2 places by
+            # EnhancedRewardCalculator)
             iter_summary['rewards'] = {
-                dim: round(data.get('reward', 0), 2)
-                for dim, data in breakdown.get('dimensions', {}).items()
+                dim: data['reward']
+                for dim, data in (breakdown.get('dimensions') or {}).items()
+                if 'reward' in data
             }
             
             iter_summary['penalties'] = breakdown.get('penalties', 0)
@@ -199,6 +237,12 @@ def format_reward_json(metadata: Dict[str, Any]) -> str:
         
         reward_data['iterations'].append(iter_summary)
     
+    if orjson is not None:
+        try:
+            return orjson.dumps(reward_data, option=orjson.OPT_INDENT_2).decode()
+        except TypeError:
+            # Values orjson can't encode (e.g. numpy scalars) - use stdlib
+            pass
     return json.dumps(reward_data, indent=2)
 
 
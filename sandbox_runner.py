@@ -1,15 +1,53 @@
-"""Sandboxed Runner Module - Executes code in isolated Docker containers."""
-import docker
+"""Sandboxed Runner Module - Executes code in isolated Docker containers.
+
+The docker SDK is imported when a SandboxRunner is created, so modules that
+only need TestResult (e.g. failure_analyzer) don't pay for it.
+"""
 import tempfile
+import io
 import os
+import re
+import tarfile
+import xml.etree.ElementTree as ET
+import shutil
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
 import json
 import time
 
 from logger import logger
 from config import Config
 
+# pytest summary counts, e.g. "5 passed, 2 failed, 1 error in 0.42s"
+_SUMMARY_COUNT_RE = re.compile(r'(\d+) (passed|failed|errors?|skipped)\b')
+
+# Trailing lines searched for the summary before falling back to a full scan
+_SUMMARY_TAIL_LINES = 50
+
+# Full-output fallbacks when no summary line is found
+_PASSED_RE = re.compile(r'(\d+) passed')
+_FAILED_RE = re.compile(r'(\d+) failed')
+_ERROR_RE = re.compile(r'(\d+) error')
+_SKIPPED_RE = re.compile(r'(\d+) skipped')
+
+# Exit statuses of `timeout` when it kills pytest (coreutils, busybox)
+_TIMEOUT_EXIT_CODES = (124, 143)
+
+# pytest's JUnit XML report, written inside the container (the workspace
+# is read-only); {name} is the run's code directory name
+_JUNIT_XML_PATH = "/tmp/{name}.xml"
+
+# Chars scanned after a FAILED line for its error message, and the
+# markers of lines worth reporting
+_FAILURE_WINDOW = 1000
+_ERROR_KEYWORDS = ('AssertionError', 'Error:', 'Expected', 'assert', 'FAILED')
+
+# Failed test names, e.g. "FAILED test_impl.py::test_function_name"
+_FAILURE_RE = re.compile(r'FAILED\s+(?:[\w\./]+::)?(test_\w+)')
+
 class TestResult:
     """Container for test execution results."""
     
@@ -43,16 +81,41 @@ class TestResult:
             "pass_rate": self.passed / self.total if self.total > 0 else 0.0
         }
 
+def _remove_container(container):
+    """Force-remove a container, logging instead of raising."""
+    try:
+        container.remove(force=True)
+        logger.info("[SANDBOX] Container destroyed", container_id=container.short_id)
+    except Exception as e:
+        logger.warning("Failed to remove sandbox container", error=str(e))
+
 class SandboxRunner:
     """Executes code and tests in sandboxed Docker containers."""
     
     def __init__(self):
         self.docker_client = None
+        self._image_ready = False  # Set once DOCKER_IMAGE is known to be present
+        
+        # Reused container (SANDBOX_REUSE_CONTAINER) and the host directory
+        # mounted as its /workspace, both created on first use. Each is also
+        # removed if the runner is collected or the process exits without
+        # cleanup() being called.
+        self._exec_container = None
+        self._container_finalizer = None
+        self._workspace_root = None
+        self._workspace_finalizer = None
+        self._exec_lock = threading.RLock()
+        # One pytest at a time in the reused container: it has the single-run
+        # MAX_MEMORY limit, and concurrent runs would skew each other's timing
+        self._run_lock = threading.Lock()
+        
         self._initialize_docker()
     
     def _initialize_docker(self):
         """Initialize Docker client."""
         try:
+            import docker
+            
             self.docker_client = docker.from_env()
             # Test connection
             self.docker_client.ping()
@@ -81,7 +144,7 @@ class SandboxRunner:
         start_time = time.time()
         
         # Create temporary directory for code
-        with tempfile.TemporaryDirectory() as temp_dir:
+        with tempfile.TemporaryDirectory(dir=self._run_dir_parent()) as temp_dir:
             temp_path = Path(temp_dir)
             
             # Write code files
@@ -95,33 +158,39 @@ class SandboxRunner:
                         first_line=code.split('\n')[0] if code else "EMPTY",
                         has_def=("def " in code))
             
+            # Encoded once; the same bytes go to the logs and the sandbox
+            code_bytes = code.encode('utf-8')
+            test_bytes = test_code.encode('utf-8')
+            
             # ALWAYS save code for debugging
             debug_file = Config.LOGS_DIR / "last_generated_impl.py"
-            debug_file.write_text(code, encoding='utf-8')
+            debug_file.write_bytes(code_bytes)
             logger.info(f"Generated code saved to {debug_file}")
             
             debug_test_file = Config.LOGS_DIR / "last_generated_test.py"
-            debug_test_file.write_text(test_code, encoding='utf-8')
+            debug_test_file.write_bytes(test_bytes)
             logger.info(f"Generated tests saved to {debug_test_file}")
             
-            # Quick syntax check before writing
-            try:
-                compile(code, '<string>', 'exec')
-                logger.debug("Code syntax is valid")
-            except SyntaxError as e:
-                logger.error("SYNTAX ERROR before writing to file",
-                            error=str(e),
-                            line=e.lineno,
-                            offset=e.offset,
-                            text=e.text)
-                # Save problematic code for debugging to logs folder
-                error_file = Config.LOGS_DIR / "last_syntax_error.py"
-                error_file.write_text(f"# SYNTAX ERROR at line {e.lineno}\n# {e.msg}\n\n{code}", encoding='utf-8')
-                logger.error(f"Problematic code saved to {error_file}")
+            # Quick syntax check before writing (debug only - pytest's
+            # collection error reports the same SyntaxError)
+            if Config.DEBUG_SYNTAX_CHECK:
+                try:
+                    compile(code, '<string>', 'exec')
+                    logger.debug("Code syntax is valid")
+                except SyntaxError as e:
+                    logger.error("SYNTAX ERROR before writing to file",
+                                error=str(e),
+                                line=e.lineno,
+                                offset=e.offset,
+                                text=e.text)
+                    # Save problematic code for debugging to logs folder
+                    error_file = Config.LOGS_DIR / "last_syntax_error.py"
+                    error_file.write_text(f"# SYNTAX ERROR at line {e.lineno}\n# {e.msg}\n\n{code}", encoding='utf-8')
+                    logger.error(f"Problematic code saved to {error_file}")
             
-            impl_file.write_text(code, encoding='utf-8')
-            test_file.write_text(test_code, encoding='utf-8')
-            requirements_file.write_text("pytest\nhypothesis\n", encoding='utf-8')
+            impl_file.write_bytes(code_bytes)
+            test_file.write_bytes(test_bytes)
+            requirements_file.write_bytes(b"pytest\nhypothesis\n")
             
             try:
                 # Run in Docker container
@@ -135,8 +204,8 @@ class SandboxRunner:
                 result.exit_code = container_result.get("exit_code", 1)
                 result.timed_out = container_result.get("timed_out", False)
                 
-                # Parse pytest output
-                self._parse_pytest_output(result)
+                # Parse pytest output (structured report when available)
+                self._parse_pytest_output(result, container_result.get("junit_xml"))
                 
             except Exception as e:
                 logger.error("Sandbox execution failed", error=str(e))
@@ -153,6 +222,50 @@ class SandboxRunner:
         
         return result
     
+    def _pytest_command(self, report_path: str) -> List[str]:
+        """Build the pytest command run in the sandbox.
+        
+        The cache provider is disabled: the workspace is read-only, so it
+        could only warn. -v --tb=short output is kept for FailureAnalyzer.
+        
+        Args:
+            report_path: Container path for the JUnit XML report
+            
+        Returns:
+            Command as an argument list
+        """
+        command = ["pytest", "test_impl.py", "-v", "--tb=short", "--no-header",
+                   "-p", "no:cacheprovider", f"--junitxml={report_path}"]
+        if Config.FAIL_FAST:
+            command.append("-x")
+        return command
+    
+    def run_tests_batch(self, items: List[Tuple[str, str]], max_workers: int = 4,
+                        timeout: int = None) -> List[TestResult]:
+        """Run several test suites, concurrently when each has its own container.
+        
+        Per-run containers each get the full MAX_MEMORY limit, so up to
+        max_workers run at once. With SANDBOX_REUSE_CONTAINER the runs share
+        one container sized for a single pytest, so they run one after
+        another (still saving container startup per run).
+        
+        Args:
+            items: (code, test_code) pairs
+            max_workers: Maximum runs in flight at once
+            timeout: Execution timeout in seconds, per run
+            
+        Returns:
+            TestResult objects, in the order of items
+        """
+        if len(items) <= 1 or Config.SANDBOX_REUSE_CONTAINER:
+            return [self.run_tests(code, test_code, timeout) for code, test_code in items]
+        
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(items)),
+                                thread_name_prefix='sandbox') as pool:
+            return list(pool.map(
+                lambda item: self.run_tests(item[0], item[1], timeout), items
+            ))
+    
     def _run_in_container(self, code_dir: Path, 
                          timeout: int) -> Dict[str, Any]:
         """Execute code in Docker container with security restrictions.
@@ -165,12 +278,19 @@ class SandboxRunner:
             Dictionary with stdout, stderr, exit_code, timed_out
         """
         try:
-            # Pull image if not present
-            try:
-                self.docker_client.images.get(Config.DOCKER_IMAGE)
-            except docker.errors.ImageNotFound:
-                logger.info("Pulling Docker image", image=Config.DOCKER_IMAGE)
-                self.docker_client.images.pull(Config.DOCKER_IMAGE)
+            # Pull image if not present (checked once per runner, not per run)
+            if not self._image_ready:
+                from docker.errors import ImageNotFound
+                
+                try:
+                    self.docker_client.images.get(Config.DOCKER_IMAGE)
+                except ImageNotFound:
+                    logger.info("Pulling Docker image", image=Config.DOCKER_IMAGE)
+                    self.docker_client.images.pull(Config.DOCKER_IMAGE)
+                self._image_ready = True
+            
+            if Config.SANDBOX_REUSE_CONTAINER:
+                return self._exec_in_container(code_dir, timeout)
             
             # Run container with restrictions
             logger.info("[SANDBOX] Creating isolated Docker container", 
@@ -182,10 +302,7 @@ class SandboxRunner:
             
             container = self.docker_client.containers.run(
                 image=Config.DOCKER_IMAGE,
-                command=[
-                    "/bin/sh", "-c",
-                    "pytest test_impl.py -v --tb=short --no-header"
-                ],
+                command=self._pytest_command(_JUNIT_XML_PATH.format(name=code_dir.name)),
                 volumes={
                     str(code_dir.absolute()): {
                         'bind': '/workspace',
@@ -218,9 +335,16 @@ class SandboxRunner:
                 else:
                     exit_code = result_code
                 
-                # Get logs BEFORE removing container
-                stdout = container.logs(stdout=True, stderr=False).decode('utf-8')
-                stderr = container.logs(stdout=False, stderr=True).decode('utf-8')
+                # Get logs and report BEFORE removing container. Attaching with
+                # logs=True replays both streams, already split, in one request
+                stdout, stderr = container.attach(
+                    stdout=True, stderr=True, logs=True, stream=False, demux=True
+                )
+                stdout = stdout.decode('utf-8', errors='replace') if stdout else ""
+                stderr = stderr.decode('utf-8', errors='replace') if stderr else ""
+                junit_xml = self._read_container_file(
+                    container, _JUNIT_XML_PATH.format(name=code_dir.name)
+                )
                 
                 logger.info("[SANDBOX] Tests completed", 
                            container_id=container.short_id,
@@ -234,7 +358,8 @@ class SandboxRunner:
                     "stdout": stdout,
                     "stderr": stderr,
                     "exit_code": exit_code,
-                    "timed_out": False
+                    "timed_out": False,
+                    "junit_xml": junit_xml
                 }
                 
             except Exception as e:
@@ -262,61 +387,287 @@ class SandboxRunner:
                 "timed_out": False
             }
     
-    def _parse_pytest_output(self, result: TestResult):
-        """Parse pytest output to extract test results.
+    def _run_dir_parent(self) -> Optional[str]:
+        """Return the directory per-run code directories are created in.
+        
+        With SANDBOX_REUSE_CONTAINER this is the host directory mounted into
+        the reused container; otherwise None (the system temp directory).
+        """
+        if not Config.SANDBOX_REUSE_CONTAINER:
+            return None
+        
+        with self._exec_lock:
+            if self._workspace_root is None:
+                self._workspace_root = Path(tempfile.mkdtemp(prefix='auto_tdd_sandbox_'))
+                self._workspace_finalizer = weakref.finalize(
+                    self, shutil.rmtree, self._workspace_root, True
+                )
+            return str(self._workspace_root)
+    
+    def _get_exec_container(self):
+        """Return the long-running sandbox container, starting it if needed."""
+        with self._exec_lock:
+            if self._exec_container is None:
+                logger.info("[SANDBOX] Creating reusable Docker container", 
+                           image=Config.DOCKER_IMAGE,
+                           memory_limit=Config.MAX_MEMORY,
+                           cpu_quota=f"{Config.CPU_QUOTA/1000}%",
+                           network="disabled",
+                           filesystem="read-only")
+                
+                # Idles until tests are exec'd into it; the workspace root
+                # holds one subdirectory per run
+                self._exec_container = self.docker_client.containers.run(
+                    image=Config.DOCKER_IMAGE,
+                    command=["tail", "-f", "/dev/null"],
+                    volumes={
+                        str(Path(self._run_dir_parent()).absolute()): {
+                            'bind': '/workspace',
+                            'mode': 'ro'  # Read-only
+                        }
+                    },
+                    working_dir='/workspace',
+                    mem_limit=Config.MAX_MEMORY,
+                    cpu_quota=Config.CPU_QUOTA,
+                    network_disabled=Config.NETWORK_DISABLED,
+                    detach=True,
+                    environment={
+                        'PYTHONDONTWRITEBYTECODE': '1',
+                        'PYTEST_DISABLE_PLUGIN_AUTOLOAD': '1'
+                    }
+                )
+                
+                self._container_finalizer = weakref.finalize(
+                    self, _remove_container, self._exec_container
+                )
+                
+                logger.info("[SANDBOX] Container started", 
+                           container_id=self._exec_container.short_id,
+                           status="running")
+            return self._exec_container
+    
+    def _exec_in_container(self, code_dir: Path, timeout: int) -> Dict[str, Any]:
+        """Run pytest on a code directory inside the reused container.
+        
+        Args:
+            code_dir: Directory containing code files, under the workspace root
+            timeout: Execution timeout
+            
+        Returns:
+            Dictionary with stdout, stderr, exit_code, timed_out
+        """
+        from docker.errors import APIError
+        
+        container = self._get_exec_container()
+        
+        try:
+            with self._run_lock:
+                logger.info("[SANDBOX] Executing tests...", container_id=container.short_id)
+                # exec has no timeout of its own, so pytest runs under `timeout`
+                report_path = _JUNIT_XML_PATH.format(name=code_dir.name)
+                exit_code, (stdout, stderr) = container.exec_run(
+                    ["timeout", str(timeout), *self._pytest_command(report_path)],
+                    workdir=f"/workspace/{code_dir.name}",
+                    demux=True
+                )
+                # Read the report, then reset the container for the next run:
+                # kill anything the tests left running (kill -1 spares PID 1
+                # and this shell) and empty /tmp, report included
+                report_code, (report, _) = container.exec_run(
+                    ["sh", "-c",
+                     f"cat {report_path}; status=$?; "
+                     "kill -9 -1 2>/dev/null; "
+                     "rm -rf /tmp/* /tmp/.[!.]* 2>/dev/null; "
+                     "exit $status"],
+                    demux=True
+                )
+        except APIError:
+            # Container died or was removed - start a fresh one next run
+            with self._exec_lock:
+                if self._exec_container is container:
+                    self._container_finalizer()
+                    self._container_finalizer = None
+                    self._exec_container = None
+            raise
+        
+        timed_out = exit_code in _TIMEOUT_EXIT_CODES
+        if timed_out:
+            logger.warning("Container execution timeout", timeout=timeout)
+        
+        logger.info("[SANDBOX] Tests completed", 
+                   container_id=container.short_id,
+                   exit_code=exit_code)
+        
+        return {
+            "stdout": stdout.decode('utf-8', errors='replace') if stdout else "",
+            "stderr": stderr.decode('utf-8', errors='replace') if stderr else "",
+            "exit_code": 124 if timed_out else exit_code,
+            "timed_out": timed_out,
+            "junit_xml": report.decode('utf-8') if report_code == 0 and report else None
+        }
+    
+    def _read_container_file(self, container, path: str) -> Optional[str]:
+        """Read a text file out of a (possibly stopped) container.
+        
+        Returns:
+            File contents, or None if it could not be read
+        """
+        try:
+            stream, _ = container.get_archive(path)
+            with tarfile.open(fileobj=io.BytesIO(b"".join(stream))) as tar:
+                member = tar.next()
+                data = tar.extractfile(member) if member else None
+                return data.read().decode('utf-8') if data else None
+        except Exception as e:
+            logger.debug("Could not read file from container", path=path, error=str(e))
+            return None
+    
+    def _parse_junit_report(self, result: TestResult, junit_xml: str) -> bool:
+        """Populate counts and failures from pytest's JUnit XML report.
         
         Args:
             result: TestResult object to populate
+            junit_xml: Contents of the --junitxml report
+            
+        Returns:
+            True if the report was parsed, False if it was malformed
         """
-        output = result.stdout + result.stderr
+        try:
+            root = ET.fromstring(junit_xml)
+        except ET.ParseError as e:
+            logger.warning("Malformed JUnit report, parsing text output", error=str(e))
+            return False
         
-        # Parse test counts
-        # Look for patterns like: "5 passed, 2 failed, 1 error in 0.42s"
-        import re
+        suites = [root] if root.tag == 'testsuite' else root.findall('testsuite')
+        if not suites:
+            return False
         
-        # Passed tests
-        passed_match = re.search(r'(\d+) passed', output)
-        if passed_match:
-            result.passed = int(passed_match.group(1))
+        total = failed = errors = skipped = 0
+        for suite in suites:
+            total += int(suite.get('tests', 0))
+            failed += int(suite.get('failures', 0))
+            errors += int(suite.get('errors', 0))
+            skipped += int(suite.get('skipped', 0))
+            
+            for case in suite.iter('testcase'):
+                failure = case.find('failure')
+                if failure is None:
+                    continue
+                
+                # pytest puts the exception line(s) in the message attribute;
+                # fall back to the "E   ..." lines of the traceback
+                error_msg = ' '.join((failure.get('message') or '').split())
+                if not error_msg:
+                    error_lines = [
+                        line[1:].strip() for line in (failure.text or '').splitlines()
+                        if line.startswith('E ')
+                    ]
+                    error_msg = ' '.join(error_lines[:3]) or "Test failed"
+                
+                result.failures.append({
+                    "test": case.get('name', ''),
+                    "message": error_msg[:500]  # Limit length
+                })
+        
+        result.failed = failed
+        result.errors = errors
+        result.skipped = skipped
+        result.passed = max(total - failed - errors - skipped, 0)
+        result.total = total
+        return True
+    
+    def _find_summary_counts(self, output: str) -> Dict[str, int]:
+        """Find pytest's final summary line and read its counts.
         
-        # Failed tests
-        failed_match = re.search(r'(\d+) failed', output)
-        if failed_match:
-            result.failed = int(failed_match.group(1))
+        Scans back from the end of the output instead of searching all of it.
         
-        # Errors
-        error_match = re.search(r'(\d+) error', output)
-        if error_match:
-            result.errors = int(error_match.group(1))
+        Args:
+            output: pytest stdout or stderr
+            
+        Returns:
+            Mapping of outcome ("passed", "failed", "error(s)", "skipped") to
+            count; empty if no summary line was found
+        """
+        for line in reversed(output.rsplit('\n', _SUMMARY_TAIL_LINES)):
+            if ' in ' in line:
+                counts = {kind: int(n) for n, kind in _SUMMARY_COUNT_RE.findall(line)}
+                if counts:
+                    return counts
+        return {}
+    
+    def _parse_pytest_output(self, result: TestResult, junit_xml: Optional[str] = None):
+        """Parse pytest output to extract test results.
         
-        # Skipped
-        skipped_match = re.search(r'(\d+) skipped', output)
-        if skipped_match:
-            result.skipped = int(skipped_match.group(1))
+        Uses the JUnit XML report when one was produced; the text output is
+        only parsed when it is missing (e.g. pytest was killed) or malformed.
+        
+        Args:
+            result: TestResult object to populate
+            junit_xml: Contents of pytest's --junitxml report, if any
+        """
+        if junit_xml and self._parse_junit_report(result, junit_xml):
+            return
+        
+        # stdout and stderr are scanned separately (stdout first) rather
+        # than concatenated, which would copy the whole output
+        stdout, stderr = result.stdout, result.stderr
+        
+        # Parse test counts from pytest's final summary line
+        counts = self._find_summary_counts(stdout) or self._find_summary_counts(stderr)
+        
+        if counts:
+            result.passed = counts.get('passed', 0)
+            result.failed = counts.get('failed', 0)
+            result.errors = counts.get('error', 0) + counts.get('errors', 0)
+            result.skipped = counts.get('skipped', 0)
+        else:
+            # No summary line (e.g. truncated output) - search everything
+            # Passed tests
+            passed_match = _PASSED_RE.search(stdout) or _PASSED_RE.search(stderr)
+            if passed_match:
+                result.passed = int(passed_match.group(1))
+            
+            # Failed tests
+            failed_match = _FAILED_RE.search(stdout) or _FAILED_RE.search(stderr)
+            if failed_match:
+                result.failed = int(failed_match.group(1))
+            
+            # Errors
+            error_match = _ERROR_RE.search(stdout) or _ERROR_RE.search(stderr)
+            if error_match:
+                result.errors = int(error_match.group(1))
+            
+            # Skipped
+            skipped_match = _SKIPPED_RE.search(stdout) or _SKIPPED_RE.search(stderr)
+            if skipped_match:
+                result.skipped = int(skipped_match.group(1))
         
         result.total = result.passed + result.failed + result.errors + result.skipped
         
         # Extract failure details
         # Look for FAILED test_impl.py::test_name or just test_name
-        # Pattern matches: "FAILED test_impl.py::test_function_name"
-        failure_pattern = r'FAILED\s+(?:[\w\./]+::)?(test_\w+)'
-        failures = re.finditer(failure_pattern, output)
+        # (pytest reports failures on stdout)
+        failures = _FAILURE_RE.finditer(stdout)
         
         for match in failures:
             test_name = match.group(1)
             
             # Try to extract error message after the test name
-            # Look for the section after this test failure
-            test_pos = match.end()
-            next_section = output[test_pos:test_pos + 1000]  # Look ahead 1000 chars
+            # Look for the section after this test failure, walking it line
+            # by line in place rather than slicing and splitting it
+            pos = match.end()
+            window_end = min(pos + _FAILURE_WINDOW, len(stdout))
             
-            # Extract first line that looks like an error
+            # Extract first lines that look like an error
             error_lines = []
-            for line in next_section.split('\n'):
-                if any(keyword in line for keyword in ['AssertionError', 'Error:', 'Expected', 'assert', 'FAILED']):
+            while pos <= window_end and len(error_lines) < 3:  # Up to 3 lines of error context
+                line_end = stdout.find('\n', pos, window_end)
+                if line_end == -1:
+                    line_end = window_end
+                line = stdout[pos:line_end]
+                if any(keyword in line for keyword in _ERROR_KEYWORDS):
                     error_lines.append(line.strip())
-                    if len(error_lines) >= 3:  # Get up to 3 lines of error context
-                        break
+                pos = line_end + 1
             
             error_msg = ' '.join(error_lines) if error_lines else "Test failed"
             
@@ -329,18 +680,30 @@ class SandboxRunner:
         if result.failed > 0 and len(result.failures) == 0:
             logger.warning("Failed to extract failure details",
                           failed_count=result.failed,
-                          output_preview=output[:1000])
+                          output_preview=(stdout or stderr)[:1000])
         
         # If exit code is 0 but no passed tests found, might be all passed
         if result.exit_code == 0 and result.passed == 0 and result.total == 0:
             # Try to count test functions
-            test_count = output.count("PASSED")
+            test_count = stdout.count("PASSED") + stderr.count("PASSED")
             if test_count > 0:
                 result.passed = test_count
                 result.total = test_count
     
     def cleanup(self):
         """Clean up Docker resources."""
+        with self._exec_lock:
+            # Calling a finalizer runs it once and disarms it
+            if self._container_finalizer is not None:
+                self._container_finalizer()
+                self._container_finalizer = None
+            self._exec_container = None
+            
+            if self._workspace_finalizer is not None:
+                self._workspace_finalizer()
+                self._workspace_finalizer = None
+            self._workspace_root = None
+        
         if self.docker_client:
             try:
                 # Remove dangling containers
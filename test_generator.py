@@ -1,35 +1,221 @@
 """Test Generator Module - Generates comprehensive test suites using LLM."""
+import hashlib
 import json
+import os
+import re
 import requests
-from typing import List, Dict, Any
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+from pathlib import Path
+from typing import Iterator, List, Dict, Any, Optional, Tuple, Union
 
 from parser import ProblemSpec
 from logger import logger
 from config import Config
 from utils import validate_python_syntax
 
+# Test function definitions at the start of a line; commented-out tests and
+# "def test_" inside strings are not counted
+_TEST_DEF_RE = re.compile(r'^[ \t]*(?:async[ \t]+)?def[ \t]+test_\w*', re.MULTILINE)
+
+# Several prompts packed into one request for generate_batch; each suite in
+# the response starts with its <<<SUITE_k>>> marker
+_PACKED_PROMPT_HEADER = """\
+Generate {count} independent pytest test suites, one for each task below.
+Start suite k with a line containing only the marker <<<SUITE_k>>> (k = 1 to {count}),
+followed by that suite's code in its own ```python block."""
+_SUITE_MARKER_RE = re.compile(r'<<<SUITE_(\d+)>>>')
+
+# Fixed parts of the test generation prompt, filled with str.format_map;
+# only the spec-dependent sections in between are built per call
+_PROMPT_HEADER = """\
+You are an expert Python test engineer. Generate a comprehensive pytest test suite.
+
+CRITICAL: The function name is '{function_name}' - you MUST import and test this exact function name!
+
+REQUIREMENTS:
+1. Test the function: {function_name}
+2. Function description: {description}"""
+
+_PROMPT_FOOTER = """
+GENERATE:
+1. Import statement: from impl import {function_name}
+2. Happy path tests - test normal valid inputs
+3. Edge case tests - test boundary values, empty inputs, etc.
+4. Error handling tests - test invalid inputs raise appropriate errors
+5. Property-based tests if applicable
+
+CRITICAL REQUIREMENTS:
+- MUST use: from impl import {{spec.function_name}}
+- MUST test the function named: {function_name}
+- Each test must have a clear docstring
+- Use test names like: test_{function_name}_<scenario>
+- Include proper assertions with helpful messages
+- Write clean, professional test code
+
+REMINDER: The function you are testing is called '{function_name}'
+
+Generate ONLY the test code, no explanations:"""
+
+def _iter_spec_sections(spec: ProblemSpec) -> Iterator[str]:
+    """Yield the prompt lines describing a spec's parameters, examples, etc.
+    
+    Args:
+        spec: Problem specification
+        
+    Yields:
+        Prompt lines; section headings carry their own leading blank line
+    """
+    # Add parameter information
+    if spec.parameters:
+        yield "\nPARAMETERS:"
+        for param in spec.parameters:
+            if param.description:
+                yield f"  - {param.name}: {param.type_hint} ({param.description})"
+            else:
+                yield f"  - {param.name}: {param.type_hint}"
+    
+    # Add return type
+    if spec.return_type:
+        yield f"\nRETURN TYPE: {spec.return_type}"
+    
+    # Add examples
+    if spec.examples:
+        yield "\nEXAMPLES:"
+        for i, example in enumerate(spec.examples, 1):
+            yield f"  Example {i}: {example}"
+    
+    # Add constraints
+    if spec.constraints:
+        yield "\nCONSTRAINTS:"
+        for constraint in spec.constraints:
+            yield f"  - {constraint}"
+    
+    # Add edge cases
+    if spec.edge_cases:
+        yield "\nEDGE CASES TO TEST:"
+        for edge_case in spec.edge_cases:
+            yield f"  - {edge_case}"
+
+def _read_cached_tests(cache_file: Optional[Path]) -> Optional[str]:
+    """Return cached test code, or None on a miss or unreadable file."""
+    if cache_file is None:
+        return None
+    try:
+        return cache_file.read_text(encoding='utf-8')
+    except OSError:
+        return None
+
+def _write_cached_tests(cache_file: Optional[Path], test_code: str):
+    """Store validated test code; the cache is best-effort."""
+    if cache_file is None:
+        return
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        # Write a unique temp file then rename, so concurrent writers never
+        # share a temp file and readers never see a partial one
+        fd, tmp_name = tempfile.mkstemp(dir=cache_file.parent, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(test_code)
+            os.replace(tmp_name, cache_file)
+        except OSError:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+    except OSError as e:
+        logger.warning("Failed to cache generated tests", error=str(e))
+
 class TestGenerator:
     """Generates pytest test suites from problem specifications using LLM."""
     
     def __init__(self):
         self.test_count = 0
         self.provider = Config.TEST_LLM_PROVIDER
+        self.session = requests.Session()  # Keeps the Ollama connection alive between calls
+        
+        # Primary provider first, then any fallbacks, each behind a circuit
+        # breaker so a provider that keeps failing is skipped for a while
+        self._providers = []  # (name, call) in priority order
+        self._circuits = {}  # name -> [consecutive failures, open until (monotonic)]
+        fallbacks = [name.strip() for name in Config.TEST_LLM_FALLBACKS.split(",") if name.strip()]
+        for name in [self.provider, *fallbacks]:
+            if name in self._circuits:
+                continue
+            call = self._init_provider(name, primary=name == self.provider)
+            if call is not None:
+                self._providers.append((name, call))
+                self._circuits[name] = [0, 0.0]
+    
+    def _init_provider(self, name: str, primary: bool):
+        """Set up one LLM provider and return its call method.
         
-        # Initialize providers based on config
-        if self.provider == "openai":
+        Args:
+            name: Provider name (openai, gemini or ollama)
+            primary: Whether this is Config.TEST_LLM_PROVIDER; an unknown
+                primary name falls back to Ollama as before
+            
+        Returns:
+            Bound _call_* method, or None for an unknown fallback name
+        """
+        if name == "openai":
             from openai_provider import OpenAIProvider
             self.openai = OpenAIProvider()
-            logger.info("Test generator using OpenAI API")
-        elif self.provider == "gemini":
+            logger.info("Test generator using OpenAI API", fallback=not primary)
+            return self._call_openai
+        if name == "gemini":
             from gemini_provider import GeminiProvider
             self.gemini = GeminiProvider()
-            logger.info("Test generator using Gemini API")
-        else:
-            # Ollama setup
-            self.ollama_url = f"{Config.OLLAMA_HOST}/api/generate"
-            self.model = Config.OLLAMA_MODEL
-            self.temperature = 0.2
-            self.max_tokens = Config.OLLAMA_MAX_TOKENS
+            logger.info("Test generator using Gemini API", fallback=not primary)
+            return self._call_gemini
+        if name != "ollama" and not primary:
+            logger.warning("Unknown fallback LLM provider ignored", provider=name)
+            return None
+        
+        # Ollama setup
+        self.ollama_url = f"{Config.OLLAMA_HOST}/api/generate"
+        self.model = Config.OLLAMA_MODEL
+        self.temperature = 0.2
+        self.max_tokens = Config.OLLAMA_MAX_TOKENS
+        return self._call_ollama
+    
+    def _call_llm(self, prompt: str, suites: int = 1) -> Tuple[str, Optional[str]]:
+        """Call providers in priority order until one returns a response.
+        
+        Providers whose circuit is open are skipped; if every circuit is
+        open they are all tried anyway rather than failing outright.
+        
+        Args:
+            prompt: Generation prompt
+            suites: Test suites the prompt asks for (more than 1 for packed
+                prompts, whose suites are marked <<<SUITE_k>>>)
+            
+        Returns:
+            Raw LLM response and the provider that gave it, or ("", None)
+            if every provider failed
+        """
+        now = time.monotonic()
+        providers = [
+            (name, call) for name, call in self._providers
+            if self._circuits[name][1] <= now
+        ] or self._providers
+        
+        for name, call in providers:
+            circuit = self._circuits[name]
+            response = call(prompt, suites)
+            if response:
+                circuit[0] = 0
+                return response, name
+            
+            circuit[0] += 1
+            if circuit[0] >= Config.LLM_CIRCUIT_FAILURES:
+                circuit[1] = time.monotonic() + Config.LLM_CIRCUIT_COOLDOWN
+                logger.warning("LLM provider circuit opened", provider=name,
+                             failures=circuit[0], cooldown=Config.LLM_CIRCUIT_COOLDOWN)
+            else:
+                logger.warning("LLM provider failed", provider=name, failures=circuit[0])
+        return "", None
     
     def generate(self, spec: ProblemSpec) -> str:
         """Generate complete test suite for given specification using LLM.
@@ -45,13 +231,156 @@ class TestGenerator:
         # Build prompt for LLM
         prompt = self._build_test_generation_prompt(spec)
         
-        # Call appropriate LLM provider
-        if self.provider == "openai":
-            test_code = self._call_openai(prompt)
-        elif self.provider == "gemini":
-            test_code = self._call_gemini(prompt)
+        # Reuse tests already generated for the same prompt and model
+        cache_file = self._llm_cache_file(prompt)
+        test_code = _read_cached_tests(cache_file)
+        if test_code is not None:
+            logger.info("Using cached tests", function=spec.function_name,
+                       cache_file=str(cache_file))
+        else:
+            test_code, provider = self._generate_uncached(spec, prompt)
+            # The cache is keyed on the primary provider; fallback answers
+            # are used but not stored under its key
+            if provider == self.provider:
+                _write_cached_tests(cache_file, test_code)
+        
+        # Count tests
+        self.test_count = sum(1 for _ in _TEST_DEF_RE.finditer(test_code))
+        
+        logger.info("Generated test suite", 
+                   test_count=self.test_count,
+                   lines=len(test_code.split('\n')))
+        
+        return test_code
+    
+    def generate_many(self, specs: List[ProblemSpec],
+                      max_workers: int = None) -> List[Union[str, Exception]]:
+        """Generate test suites for several specifications concurrently.
+        
+        Each spec is a separate generate() call; keeping several requests in
+        flight lets the provider batch them server-side instead of the
+        latencies adding up.
+        
+        Args:
+            specs: Problem specifications
+            max_workers: Most requests in flight at once
+                (default Config.LLM_MAX_CONCURRENCY)
+            
+        Returns:
+            Test code for each spec, in order, or the exception its
+            generation raised; test_count is the total over the suites
+        """
+        max_workers = max_workers or Config.LLM_MAX_CONCURRENCY
+        if len(specs) <= 1 or max_workers <= 1:
+            results = []
+            for spec in specs:
+                try:
+                    results.append(self.generate(spec))
+                except Exception as e:
+                    results.append(e)
         else:
-            test_code = self._call_ollama(prompt)
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(specs)),
+                                    thread_name_prefix='test_generate') as pool:
+                futures = [pool.submit(self.generate, spec) for spec in specs]
+            results = [future.exception() or future.result() for future in futures]
+        
+        suites = [result for result in results if isinstance(result, str)]
+        self.test_count = sum(
+            sum(1 for _ in _TEST_DEF_RE.finditer(suite)) for suite in suites
+        )
+        logger.info("Generated test suites", suites=len(suites),
+                   failed=len(results) - len(suites), test_count=self.test_count)
+        return results
+    
+    def generate_batch(self, specs: List[ProblemSpec], batch_size: int = 4) -> List[str]:
+        """Generate test suites for several specifications.
+        
+        Uncached specs are packed up to batch_size per LLM request, so
+        consecutive specs share one round-trip. Suites missing from a packed
+        response, or that fail to parse, are generated individually.
+        Providers with small output limits will mostly take that path.
+        
+        Args:
+            specs: Problem specifications
+            batch_size: Most prompts packed into one request
+            
+        Returns:
+            Test code for each spec, in order; test_count is the total
+        """
+        prompts = [self._build_test_generation_prompt(spec) for spec in specs]
+        cache_files = [self._llm_cache_file(prompt) for prompt in prompts]
+        suites = [_read_cached_tests(cache_file) for cache_file in cache_files]
+        
+        pending = [i for i, suite in enumerate(suites) if suite is None]
+        for start in range(0, len(pending), batch_size):
+            group = pending[start:start + batch_size]
+            if len(group) < 2:
+                break
+            packed, provider = self._generate_packed([prompts[i] for i in group])
+            for i, test_code in zip(group, packed):
+                if test_code is not None:
+                    suites[i] = test_code
+                    if provider == self.provider:
+                        _write_cached_tests(cache_files[i], test_code)
+        
+        # generate() serves cache hits and retries anything still missing
+        for i, suite in enumerate(suites):
+            if suite is None:
+                suites[i] = self.generate(specs[i])
+        
+        self.test_count = sum(
+            sum(1 for _ in _TEST_DEF_RE.finditer(suite)) for suite in suites
+        )
+        logger.info("Generated test suites", suites=len(suites),
+                   test_count=self.test_count)
+        return suites
+    
+    def _generate_packed(self, prompts: List[str]) -> Tuple[List[Optional[str]], Optional[str]]:
+        """Send several prompts as one request and split the response.
+        
+        Args:
+            prompts: Test generation prompts
+            
+        Returns:
+            Valid test code per prompt, or None where the response has no
+            parseable suite for it, and the provider that answered
+        """
+        packed_prompt = _PACKED_PROMPT_HEADER.format(count=len(prompts)) + "".join(
+            f"\n\n=== TASK {k} ===\n{prompt}" for k, prompt in enumerate(prompts, 1)
+        )
+        logger.info("Generating packed test suites", count=len(prompts))
+        response, provider = self._call_llm(packed_prompt, suites=len(prompts))
+        
+        # split() with a capture group alternates marker numbers and text
+        parts = _SUITE_MARKER_RE.split(response)
+        chunks = {}
+        for number, text in zip(parts[1::2], parts[2::2]):
+            chunks.setdefault(int(number), text)
+        
+        results = []
+        for k in range(1, len(prompts) + 1):
+            test_code = self._extract_code(chunks.get(k, ""))
+            if test_code and validate_python_syntax(test_code)[0]:
+                results.append(test_code)
+            else:
+                results.append(None)
+        
+        logger.info("Split packed test suites", count=len(prompts),
+                   valid=sum(code is not None for code in results))
+        return results, provider
+    
+    def _generate_uncached(self, spec: ProblemSpec, prompt: str) -> Tuple[str, Optional[str]]:
+        """Ask the LLM for tests, retrying once if they fail to parse.
+        
+        Args:
+            spec: Problem specification
+            prompt: Prompt built from spec
+            
+        Returns:
+            Syntactically valid pytest test code and the provider that gave it
+        """
+        # Call providers in priority order
+        test_code, provider = self._call_llm(prompt)
         
         if not test_code:
             error_msg = f"Failed to generate tests using {self.provider}. LLM did not return any code."
@@ -74,14 +403,9 @@ class TestGenerator:
             
             # Try to regenerate once more with a clearer prompt
             logger.warning("Attempting to regenerate tests with stricter instructions...")
-            retry_prompt = self._build_test_generation_prompt(spec) + "\n\nIMPORTANT: Ensure ALL parentheses, brackets, and quotes are properly closed!"
+            retry_prompt = prompt + "\n\nIMPORTANT: Ensure ALL parentheses, brackets, and quotes are properly closed!"
             
-            if self.provider == "openai":
-                test_code = self._call_openai(retry_prompt)
-            elif self.provider == "gemini":
-                test_code = self._call_gemini(retry_prompt)
-            else:
-                test_code = self._call_ollama(retry_prompt)
+            test_code, provider = self._call_llm(retry_prompt)
             
             if test_code:
                 test_code = self._extract_code(test_code)
@@ -95,86 +419,39 @@ class TestGenerator:
             else:
                 raise RuntimeError(f"Failed to regenerate tests: {error}")
         
-        # Count tests
-        self.test_count = test_code.count("def test_")
-        
-        logger.info("Generated test suite", 
-                   test_count=self.test_count,
-                   lines=len(test_code.split('\n')))
+        return test_code, provider
+    
+    def _llm_cache_file(self, prompt: str) -> Optional[Path]:
+        """Path under Config.CACHE_DIR for tests generated from this prompt.
         
-        return test_code
+        Args:
+            prompt: Test generation prompt
+            
+        Returns:
+            Cache file path, or None if the LLM cache is disabled
+        """
+        if not Config.LLM_CACHE_ENABLED:
+            return None
+        model = {
+            "openai": Config.OPENAI_MODEL,
+            "gemini": Config.GEMINI_MODEL,
+        }.get(self.provider, Config.OLLAMA_MODEL)
+        key = hashlib.blake2b(
+            f"{self.provider}\0{model}\0{prompt}".encode(), digest_size=16
+        ).hexdigest()
+        return Config.CACHE_DIR / "llm" / f"{key}.py"
     
     def _build_test_generation_prompt(self, spec: ProblemSpec) -> str:
         """Build comprehensive prompt for test generation."""
-        
-        prompt_parts = [
-            "You are an expert Python test engineer. Generate a comprehensive pytest test suite.",
-            "",
-            f"CRITICAL: The function name is '{spec.function_name}' - you MUST import and test this exact function name!",
-            "",
-            "REQUIREMENTS:",
-            f"1. Test the function: {spec.function_name}",
-            f"2. Function description: {spec.description}",
-        ]
-        
-        # Add parameter information
-        if spec.parameters:
-            prompt_parts.append("\nPARAMETERS:")
-            for param in spec.parameters:
-                param_info = f"  - {param.name}: {param.type_hint}"
-                if param.description:
-                    param_info += f" ({param.description})"
-                prompt_parts.append(param_info)
-        
-        # Add return type
-        if spec.return_type:
-            prompt_parts.append(f"\nRETURN TYPE: {spec.return_type}")
-        
-        # Add examples
-        if spec.examples:
-            prompt_parts.append("\nEXAMPLES:")
-            for i, example in enumerate(spec.examples, 1):
-                prompt_parts.append(f"  Example {i}: {example}")
-        
-        # Add constraints
-        if spec.constraints:
-            prompt_parts.append("\nCONSTRAINTS:")
-            for constraint in spec.constraints:
-                prompt_parts.append(f"  - {constraint}")
-        
-        # Add edge cases
-        if spec.edge_cases:
-            prompt_parts.append("\nEDGE CASES TO TEST:")
-            for edge_case in spec.edge_cases:
-                prompt_parts.append(f"  - {edge_case}")
-        
-        # Add test requirements
-        prompt_parts.extend([
-            "",
-            "GENERATE:",
-            f"1. Import statement: from impl import {spec.function_name}",
-            "2. Happy path tests - test normal valid inputs",
-            "3. Edge case tests - test boundary values, empty inputs, etc.",
-            "4. Error handling tests - test invalid inputs raise appropriate errors",
-            "5. Property-based tests if applicable",
-            "",
-            "CRITICAL REQUIREMENTS:",
-            "- MUST use: from impl import {spec.function_name}",
-            f"- MUST test the function named: {spec.function_name}",
-            "- Each test must have a clear docstring",
-            f"- Use test names like: test_{spec.function_name}_<scenario>",
-            "- Include proper assertions with helpful messages",
-            "- Write clean, professional test code",
-            "",
-            f"REMINDER: The function you are testing is called '{spec.function_name}'",
-            "",
-            "Generate ONLY the test code, no explanations:",
-        ])
-        
-        return "\n".join(prompt_parts)
-    
-    def _call_openai(self, prompt: str) -> str:
-        """Call OpenAI API to generate test code."""
+        fields = {'function_name': spec.function_name, 'description': spec.description}
+        return "\n".join(chain(
+            (_PROMPT_HEADER.format_map(fields),),
+            _iter_spec_sections(spec),
+            (_PROMPT_FOOTER.format_map(fields),),
+        ))
+    
+    def _call_openai(self, prompt: str, suites: int = 1) -> str:
+        """Call OpenAI API to generate test code (suites is unused)."""
         try:
             if not hasattr(self, 'openai'):
                 logger.error("OpenAI provider not initialized")
@@ -188,8 +465,8 @@ class TestGenerator:
             logger.error("OpenAI API error", error=str(e))
             return ""
     
-    def _call_gemini(self, prompt: str) -> str:
-        """Call Gemini API to generate test code."""
+    def _call_gemini(self, prompt: str, suites: int = 1) -> str:
+        """Call Gemini API to generate test code (suites is unused)."""
         try:
             if not hasattr(self, 'gemini'):
                 logger.error("Gemini provider not initialized")
@@ -203,13 +480,23 @@ class TestGenerator:
             logger.error("Gemini API error", error=str(e))
             return ""
     
-    def _call_ollama(self, prompt: str) -> str:
-        """Call Ollama API to generate test code."""
+    def _call_ollama(self, prompt: str, suites: int = 1) -> str:
+        """Call Ollama API to generate test code.
+        
+        The response is streamed and the request is closed as soon as the
+        last requested suite's ```python block is complete; what the model
+        would write after it is never waited for.
+        
+        Args:
+            prompt: Generation prompt
+            suites: Test suites the prompt asks for; packed prompts are
+                read until the <<<SUITE_k>>> block for the last one closes
+        """
         try:
             payload = {
                 "model": self.model,
                 "prompt": prompt,
-                "stream": False,
+                "stream": True,
                 "options": {
                     "temperature": self.temperature,
                     "num_predict": self.max_tokens,
@@ -218,18 +505,16 @@ class TestGenerator:
             
             logger.info("Calling LLM for test generation", model=self.model)
             
-            response = requests.post(
+            with self.session.post(
                 self.ollama_url,
                 json=payload,
-                timeout=Config.OLLAMA_TIMEOUT
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result.get("response", "")
-            else:
-                logger.error("LLM API error", status=response.status_code)
-                return ""
+                timeout=Config.OLLAMA_TIMEOUT,
+                stream=True
+            ) as response:
+                if response.status_code != 200:
+                    logger.error("LLM API error", status=response.status_code)
+                    return ""
+                return self._read_ollama_stream(response, suites)
                 
         except requests.Timeout:
             logger.error("LLM API timeout")
@@ -238,14 +523,64 @@ class TestGenerator:
             logger.error("LLM API error", error=str(e))
             return ""
     
+    def _read_ollama_stream(self, response, suites: int = 1) -> str:
+        """Collect a streamed Ollama response up to the last needed code block.
+        
+        For a single suite that is the first ```python block, the only one
+        _extract_code uses. For packed prompts it is the block after the
+        final <<<SUITE_k>>> marker; if that marker never appears the whole
+        response is read.
+        
+        Args:
+            response: Streaming requests response of /api/generate
+            suites: Test suites the prompt asks for
+            
+        Returns:
+            Response text, or "" if Ollama reported an error
+        """
+        last_marker = f"<<<SUITE_{suites}>>>" if suites > 1 else None
+        parts = []
+        for line in response.iter_lines():
+            if not line:
+                continue
+            chunk = json.loads(line)
+            if "error" in chunk:
+                logger.error("LLM API error", error=chunk["error"])
+                return ""
+            parts.append(chunk.get("response", ""))
+            if chunk.get("done"):
+                break
+            
+            # Only a chunk with a backtick can complete a fence
+            if "`" in parts[-1]:
+                text = "".join(parts)
+                start = 0 if last_marker is None else text.find(last_marker)
+                if start != -1:
+                    start = text.find("```python", start)
+                if start != -1 and text.find("```", start + len("```python")) != -1:
+                    logger.info("Code block complete, stopping generation early",
+                               chars=len(text))
+                    return text
+        
+        return "".join(parts)
+    
     def _extract_code(self, llm_response: str) -> str:
         """Extract Python code from LLM response."""
-        # Remove markdown code blocks if present
-        if "```python" in llm_response:
-            code = llm_response.split("```python")[1].split("```")[0]
-        elif "```" in llm_response:
-            code = llm_response.split("```")[1].split("```")[0]
-        else:
-            code = llm_response
+        # Remove markdown code blocks if present; find() locates the fences
+        # without splitting copies of the whole response
+        fence = "```python"
+        start = llm_response.find(fence)
+        if start == -1:
+            fence = "```"
+            start = llm_response.find(fence)
+        if start == -1:
+            return llm_response.strip()
         
-        return code.strip()
+        # The block ends at the first closing fence before the next opening
+        # one; an unclosed block runs to the end of the response
+        start += len(fence)
+        limit = llm_response.find(fence, start)
+        if limit == -1:
+            limit = len(llm_response)
+        end = llm_response.find("```", start, limit)
+        return llm_response[start:end if end != -1 else limit].strip()